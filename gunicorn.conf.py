@@ -0,0 +1,27 @@
+"""Gunicorn configuration for the Slack donut bot.
+
+Run with: gunicorn slackbot.bot:flask_app
+"""
+
+import os
+
+from slackbot.config import PORT, SEND_STARTUP_MESSAGE
+
+bind = f"0.0.0.0:{PORT}"
+
+# Handlers spend most of their time blocked on Slack API calls, so use
+# threaded workers to keep processing events while requests are in flight.
+# The history ts index and other caches live in process memory, so run a
+# single worker and get concurrency from threads; with several processes a
+# retried event could be recorded twice.
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+
+
+def when_ready(server):
+    """Send the startup message once the server is accepting requests."""
+    if SEND_STARTUP_MESSAGE:
+        from slackbot import bot
+
+        bot.send_startup_message()
@@ -1,30 +1,49 @@
-"""Main entry point for the Slack donut bot."""
+"""Slack donut bot WSGI app, served by gunicorn (see gunicorn.conf.py)."""
 
-import csv
 import json
+import logging
+import os
+import ssl
+from collections.abc import Iterator
 
-from flask import Flask, Response, request
+from flask import Flask, Response, request, stream_with_context
 from flask_cors import cross_origin
 from slack_bolt import App
 from slack_bolt.adapter.flask import SlackRequestHandler
+from slack_sdk import WebClient
+from slack_sdk.http_retry import all_builtin_retry_handlers
+
+from src import history
 
 from . import config, handlers
 
-print("[BOT] Starting Slack donut bot...")
-print(f"[BOT] DONUT_CHAT_CHANNEL: {config.DONUT_CHAT_CHANNEL}")
-print(f"[BOT] REGISTRY_PATH: {config.REGISTRY_PATH}")
-print(f"[BOT] HISTORY_PATH: {config.HISTORY_PATH}")
+logging.basicConfig(level=config.LOG_LEVEL)
+log = logging.getLogger(__name__)
+
+log.info("[BOT] Starting Slack donut bot...")
+log.info("[BOT] DONUT_CHAT_CHANNEL: %s", config.DONUT_CHAT_CHANNEL)
+log.info("[BOT] REGISTRY_PATH: %s", config.REGISTRY_PATH)
+log.info("[BOT] HISTORY_PATH: %s", config.HISTORY_PATH)
+
+# Share one SSL context across Slack API calls; otherwise urllib builds a new
+# one (reloading the CA bundle) for every request. Also back off and retry
+# when reaction storms hit Slack's rate limits.
+web_client = WebClient(
+    token=config.SLACK_BOT_TOKEN,
+    ssl=ssl.create_default_context(),
+    retry_handlers=all_builtin_retry_handlers(),
+)
 
 # Initialize Slack Bolt app
 bolt_app = App(
-    token=config.SLACK_BOT_TOKEN,
+    client=web_client,
     signing_secret=config.SLACK_SIGNING_SECRET,
 )
 
 # Register all event handlers
 handlers.register_handlers(bolt_app)
 
-print("[BOT] Event handlers registered")
+log.info("[BOT] Event handlers registered")
 
 # Flask app
 flask_app = Flask(__name__)
@@ -34,18 +53,17 @@ handler = SlackRequestHandler(bolt_app)
 
 @flask_app.route("/slack/events", methods=["POST"])
 def slack_events():
-    print(f"[FLASK] Received: content_type={request.content_type}")
+    log.debug("[FLASK] Received: content_type=%s", request.content_type)
     response = handler.handle(request)
-    print(f"[FLASK] Response status: {response.status_code}")
+    log.debug("[FLASK] Response status: %s", response.status_code)
     return response
 
 
 def load_registry() -> dict[str, str]:
     """Load registry and build email -> name mapping."""
     email_to_name = {}
-    with open(config.REGISTRY_PATH) as f:
-        reader = csv.reader(f)
-        for row in reader:
+    with open(config.REGISTRY_PATH, newline="") as f:
+        for row in history.split_csv_lines(f):
             if len(row) == 2:
                 name, email = row[0].strip(), row[1].strip()
                 email_to_name[email] = name
@@ -61,19 +79,27 @@ def normalize_name(value: str, email_to_name: dict[str, str]) -> str:
 @cross_origin()
 def get_chats():
     email_to_name = load_registry()
-    pairs = []
-    with open(config.HISTORY_PATH) as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) >= 2 and row[0] and row[1]:
-                pair = {
-                    "person1": normalize_name(row[0], email_to_name),
-                    "person2": normalize_name(row[1], email_to_name),
-                }
-                if len(row) >= 3 and row[2].strip():
-                    pair["timestamp"] = row[2].strip()
-                pairs.append(pair)
-    return Response(json.dumps(pairs), mimetype="application/json")
+    # Fail before streaming starts so a missing file still fails cleanly
+    os.stat(config.HISTORY_PATH)
+
+    def generate_json() -> Iterator[str]:
+        """Stream the history as a JSON array, one pair at a time."""
+        with open(config.HISTORY_PATH, newline="") as f:
+            yield "["
+            separator = ""
+            for row in history.split_csv_lines(f):
+                if len(row) >= 2 and row[0] and row[1]:
+                    pair = {
+                        "person1": normalize_name(row[0], email_to_name),
+                        "person2": normalize_name(row[1], email_to_name),
+                    }
+                    if len(row) >= 3 and row[2].strip():
+                        pair["timestamp"] = row[2].strip()
+                    yield separator + json.dumps(pair)
+                    separator = ", "
+            yield "]"
+
+    return Response(stream_with_context(generate_json()), mimetype="application/json")
 
 
 def send_startup_message():
@@ -91,20 +117,7 @@ def send_startup_message():
                 },
             ],
         )
-        print(f"[BOT] Sent startup message to {config.DONUT_CHAT_CHANNEL}")
-    except Exception as e:
-        print(f"[BOT] ERROR sending startup message: {e}")
-
-
-def start():
-    """Start the bot server."""
-    print(f"[BOT] Starting server on port {config.PORT}...")
-
-    if config.SEND_STARTUP_MESSAGE:
-        send_startup_message()
-
-    flask_app.run(host="0.0.0.0", port=config.PORT)
-
+        log.info("[BOT] Sent startup message to %s", config.DONUT_CHAT_CHANNEL)
+    except Exception:
+        log.exception("[BOT] ERROR sending startup message")
 
-if __name__ == "__main__":
-    start()
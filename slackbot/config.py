@@ -20,6 +20,9 @@ PORT = int(os.environ.get("PORT", 3000))
 # Send startup message
 SEND_STARTUP_MESSAGE = os.environ.get("SEND_STARTUP_MESSAGE", "false").lower() == "true"
 
+# Logging level for the bot's loggers (e.g. DEBUG, INFO, WARNING)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
 # File paths (relative to workspace root)
 REGISTRY_PATH = os.environ.get("REGISTRY_PATH", "./registry.csv")
 HISTORY_PATH = os.environ.get("HISTORY_PATH", "./history.csv")
@@ -1,6 +1,12 @@
 """Event handlers for the Slack donut bot."""
 
+import logging
+import os
 import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
 from itertools import combinations
 from slack_bolt import App
 from better_profanity import profanity
@@ -8,6 +14,40 @@ from better_profanity import profanity
 from . import slack_client, tracking, config
 from src import history, solver
 
+log = logging.getLogger(__name__)
+
+# Slack user mention, e.g. <@U012ABCDEF>
+_MENTION_RE = re.compile(r"<@([A-Z0-9]+)>")
+
+# Thread reply phrases that ask the bot to retry processing a message
+_RECOVERY_TRIGGER_RE = re.compile(r"try.*again|unacceptable|poop", re.IGNORECASE)
+
+# Line of a pairings message, e.g. "• Alice ⋯ Bob", optionally struck through
+_PAIRING_LINE_RE = re.compile(r"^~?•\s+(.+?)~?\s*$")
+_PAIRING_SEPARATOR_RE = re.compile(r"\s+(?:⋯|\.\.\.)\s+")
+
+
+@dataclass(slots=True)
+class RegistryIndex:
+    """Parsed registry with lookups by normalized email and lowercased name."""
+
+    by_id: list[history.Person]
+    by_norm_email: dict[str, int]
+    by_norm_name: dict[str, int]
+
+
+# Parsed registry, refreshed only when the registry file changes
+_registry_cache = {"mtime": None, "index": None}
+_registry_lock = threading.Lock()
+
+# Channel -> ts of the latest pairings message posted by /makedonuts
+_pairings_ts: dict[str, str] = {}
+
+# (channel, message ts) -> ts of our confirmation prompt reply, as an LRU
+BOT_REPLY_CACHE_SIZE = 1024
+_bot_reply_ts: OrderedDict[tuple[str, str], str] = OrderedDict()
+_bot_reply_lock = threading.Lock()
+
 
 def register_handlers(app: App) -> None:
     """Register all event handlers with the app."""
@@ -21,11 +61,7 @@ def register_handlers(app: App) -> None:
         text = event.get("text", "")
 
         # If mentioned in a thread on the parent message with a recovery trigger phrase
-        if (
-            thread_ts
-            and thread_ts != ts
-            and re.search(r"try.*again|unacceptable|poop", text, re.IGNORECASE)
-        ):
+        if thread_ts and thread_ts != ts and _RECOVERY_TRIGGER_RE.search(text):
             _recover_single_message(client, channel, thread_ts)
             return
 
@@ -59,7 +95,7 @@ def register_handlers(app: App) -> None:
 
         try:
             # Load registry and history
-            registry = history.parse_registry(config.REGISTRY_PATH)
+            registry = _get_registry().by_id
             past_meetings = history.parse_history(registry, config.HISTORY_PATH)
 
             # Generate pairings
@@ -72,19 +108,19 @@ def register_handlers(app: App) -> None:
 
             # Post to the channel where the command was invoked
             channel = command["channel_id"]
-            client.chat_postMessage(
-                channel=channel, text=text
-            )
+            response = client.chat_postMessage(channel=channel, text=text)
+            _pairings_ts[channel] = response["ts"]
 
-            print(f"Posted pairings message to {channel}")
+            log.info("Posted pairings message to %s", channel)
 
         except Exception as e:
-            print(f"Error in /makedonuts: {e}")
+            log.exception("Error in /makedonuts")
             say(f"Error generating pairings: {e}")
 
     @app.event("message")
     def handle_message(event, client, say):
         """Listen for donut chat confirmation messages with @mentions."""
+        # Cheapest checks first; most messages are rejected before any API call
         if not _is_actionable_user_message(event):
             return
 
@@ -92,22 +128,21 @@ def register_handlers(app: App) -> None:
         text = event.get("text", "")
         ts = event.get("ts")
 
-        bot_user_id = client.auth_test()["user_id"]
-        bot_mentioned = f"<@{bot_user_id}>" in text
-
-        if channel != config.DONUT_CHAT_CHANNEL and not bot_mentioned:
-            return
-
         if event.get("thread_ts") or not text or not ts:
             return
 
-        if not re.findall(r"<@([A-Z0-9]+)>", text):
+        if not _MENTION_RE.search(text):
             return
 
+        if channel != config.DONUT_CHAT_CHANNEL:
+            bot_user_id = slack_client.get_bot_user_id(client)
+            if f"<@{bot_user_id}>" not in text:
+                return
+
         try:
             _respond_to_donut_message(client, channel, ts, text)
-        except Exception as e:
-            print(f"Error in handle_message: {e}")
+        except Exception:
+            log.exception("Error in handle_message")
 
     @app.command("/recoverdonuts")
     def handle_recoverdonuts(ack, command, client):
@@ -120,7 +155,7 @@ def register_handlers(app: App) -> None:
             response = client.conversations_history(channel=channel)
             messages = response.get("messages", [])
         except Exception as e:
-            print(f"[RECOVER] Error fetching history: {e}")
+            log.exception("[RECOVER] Error fetching history")
             client.chat_postMessage(
                 channel=command["channel_id"],
                 text=f"Error fetching channel history: {e}",
@@ -152,6 +187,12 @@ def register_handlers(app: App) -> None:
             text=reply,
         )
 
+    @app.event("team_join")
+    @app.event("user_change")
+    def handle_user_change(event):
+        """Keep cached Slack user info in sync with workspace changes."""
+        slack_client.update_user_cache(event.get("user", {}))
+
     @app.event("reaction_added")
     def handle_reaction(event, client):
         """Track confirmation when someone reacts with checkmark to donut chat."""
@@ -176,8 +217,8 @@ def register_handlers(app: App) -> None:
                 return
 
             _record_donut_confirmation(client, channel, ts, messages[0])
-        except Exception as e:
-            print(f"Error in handle_reaction: {e}")
+        except Exception:
+            log.exception("Error in handle_reaction")
 
 
 def _is_actionable_user_message(message: dict) -> bool:
@@ -201,16 +242,11 @@ def _respond_to_donut_message(client, channel: str, ts: str, text: str) -> bool:
     Returns:
         True if the message was responded to, False otherwise.
     """
-    mentions = re.findall(r"<@([A-Z0-9]+)>", text)
+    mentions = _MENTION_RE.findall(text)
     if not mentions:
         return False
 
-    registry = history.parse_registry(config.REGISTRY_PATH)
-    identifier_map = _build_identifier_mapping(registry)
-
-    mentioned_names = _get_valid_mentioned_names(
-        mentions, client, registry, identifier_map
-    )
+    mentioned_names = _get_valid_mentioned_names(mentions, client, _get_registry())
     if not mentioned_names:
         return False
 
@@ -226,7 +262,29 @@ def _post_confirmation_prompt(client, channel: str, ts: str) -> None:
         "Please react to this message with :white_check_mark: "
         "to confirm the donut chat happened!"
     )
-    client.chat_postMessage(channel=channel, thread_ts=ts, text=text)
+    response = client.chat_postMessage(channel=channel, thread_ts=ts, text=text)
+
+    with _bot_reply_lock:
+        _bot_reply_ts[(channel, ts)] = response["ts"]
+        _bot_reply_ts.move_to_end((channel, ts))
+        if len(_bot_reply_ts) > BOT_REPLY_CACHE_SIZE:
+            _bot_reply_ts.popitem(last=False)
+
+
+def _get_bot_reply_ts(client, channel: str, ts: str) -> str | None:
+    """Get the ts of the bot's thread reply, fetching the thread on cache miss.
+
+    Returns:
+        The bot's reply ts, or None if not found.
+    """
+    with _bot_reply_lock:
+        reply_ts = _bot_reply_ts.get((channel, ts))
+        if reply_ts is not None:
+            _bot_reply_ts.move_to_end((channel, ts))
+            return reply_ts
+
+    bot_reply = _find_bot_reply(client, channel, ts)
+    return bot_reply["ts"] if bot_reply else None
 
 
 def _find_bot_reply(client, channel: str, ts: str) -> dict | None:
@@ -239,8 +297,8 @@ def _find_bot_reply(client, channel: str, ts: str) -> dict | None:
         thread_response = client.conversations_replies(
             channel=channel, ts=ts, limit=15
         )
-    except Exception as e:
-        print(f"Error fetching thread for {ts}: {e}")
+    except Exception:
+        log.exception("Error fetching thread for %s", ts)
         return None
 
     for thread_msg in thread_response.get("messages", []):
@@ -258,11 +316,12 @@ def _record_donut_confirmation(
     strikes through the pairings message, and updates the bot reply.
 
     Returns:
-        True if the confirmation was recorded, False if no valid people found.
+        True if the confirmation was recorded, False if no valid people found
+        or the message was already recorded.
     """
     text = message.get("text", "")
     poster_user_id = message.get("user")
-    mentions = re.findall(r"<@([A-Z0-9]+)>", text)
+    mentions = _MENTION_RE.findall(text)
 
     if not mentions or not poster_user_id:
         return False
@@ -273,32 +332,31 @@ def _record_donut_confirmation(
 
     poster_email = _normalize_email(poster_email)
 
-    registry = history.parse_registry(config.REGISTRY_PATH)
-    identifier_map = _build_identifier_mapping(registry)
+    registry = _get_registry()
 
-    if poster_email not in identifier_map:
+    poster_id = registry.by_norm_email.get(poster_email)
+    if poster_id is None:
         return False
 
-    poster_name = registry[identifier_map[poster_email]].name
+    poster_name = registry.by_id[poster_id].name
 
-    mentioned_names = _get_valid_mentioned_names(
-        mentions, client, registry, identifier_map
-    )
+    mentioned_names = _get_valid_mentioned_names(mentions, client, registry)
     if not mentioned_names:
         return False
 
     # Record donut chat for each pair
     all_people = [poster_name] + mentioned_names
     pairs = _generate_all_pairs(all_people)
-    for person1, person2 in pairs:
-        tracking.append_to_history(person1, person2, config.HISTORY_PATH, ts)
+    if not tracking.record_pairs(pairs, config.HISTORY_PATH, ts):
+        # Another event for this message already recorded it
+        return False
 
     _strikethrough_pair_in_message(client, channel, poster_name, mentioned_names)
 
     # Update the bot's thread reply
-    bot_reply = _find_bot_reply(client, channel, ts)
-    if bot_reply:
-        client.chat_update(channel=channel, ts=bot_reply["ts"], text="✅ Recorded!")
+    bot_reply_ts = _get_bot_reply_ts(client, channel, ts)
+    if bot_reply_ts:
+        client.chat_update(channel=channel, ts=bot_reply_ts, text="✅ Recorded!")
 
     return True
 
@@ -315,13 +373,34 @@ def _generate_all_pairs(people: list[str]) -> list[tuple[str, str]]:
     return list(combinations(people, 2))
 
 
-def _build_identifier_mapping(registry: dict[int, history.Person]) -> dict[str, int]:
-    """Build identifier to ID mapping from registry."""
-    mapping = {}
-    for person_id, person in registry.items():
-        mapping[person.name] = person_id
-        mapping[person.email] = person_id
-    return mapping
+def _build_registry_index(registry: list[history.Person]) -> RegistryIndex:
+    """Build lookup tables for matching Slack users against the registry.
+
+    The first person with a given key wins, matching registry order.
+    """
+    by_norm_email: dict[str, int] = {}
+    by_norm_name: dict[str, int] = {}
+    for person_id, person in enumerate(registry):
+        by_norm_email.setdefault(_normalize_email(person.email), person_id)
+        by_norm_name.setdefault(person.name.lower(), person_id)
+    return RegistryIndex(
+        by_id=registry, by_norm_email=by_norm_email, by_norm_name=by_norm_name
+    )
+
+
+def _get_registry() -> RegistryIndex:
+    """Get the parsed registry and its lookup tables.
+
+    The registry is only reparsed when the file's mtime changes, so repeated
+    Slack events reuse the cached result.
+    """
+    mtime = os.stat(config.REGISTRY_PATH).st_mtime_ns
+    with _registry_lock:
+        if _registry_cache["mtime"] != mtime:
+            registry = history.parse_registry(config.REGISTRY_PATH)
+            _registry_cache["index"] = _build_registry_index(registry)
+            _registry_cache["mtime"] = mtime
+        return _registry_cache["index"]
 
 
 def _strikethrough_pair_in_message(
@@ -336,46 +415,103 @@ def _strikethrough_pair_in_message(
         person2_list: List of second person's names
     """
     try:
-        # Get last 50 messages from the channel, filter for bot messages with pairings
+        # Try the pairings message we posted ourselves before scanning history
+        pairings_ts = _pairings_ts.get(channel)
+        if pairings_ts:
+            response = client.conversations_history(
+                channel=channel, latest=pairings_ts, limit=1, inclusive=True
+            )
+            messages = response.get("messages", [])
+            if messages and _strikethrough_pairs_in(
+                client, channel, messages[0], person1, person2_list
+            ):
+                return
+
+        # The pair may be from an earlier round, or the cached message gone, so
+        # check the last 50 messages, skipping the one already checked
         response = client.conversations_history(channel=channel, limit=50)
 
         for message in response.get("messages", []):
-            if not message.get("bot_id"):
+            if pairings_ts and message.get("ts") == pairings_ts:
                 continue
+            if _strikethrough_pairs_in(client, channel, message, person1, person2_list):
+                break
+    except Exception:
+        log.exception("Error strikethrough pair")
 
-            text = message.get("text", "")
-            if "Generated" not in text:
-                continue
 
-            # Try to find and strikethrough pairs
-            lines = text.split("\n")
-            updated = False
-
-            for person2 in person2_list:
-                # Look for line matching this pair (case-insensitive)
-                # Handle variations like "person1 ⋯ person2" or "person1 ... person2"
-                for i, line in enumerate(lines):
-                    lower_line = line.lower()
-                    if person1.lower() in lower_line and person2.lower() in lower_line:
-                        # Don't strikethrough if already done
-                        if "~" not in line:
-                            lines[i] = f"~{line}~"
-                            updated = True
-                            print(
-                                f"[STRIKETHROUGH] Found and strikethrough pair: {person1} ⋯ {person2}"
-                            )
-                        break
-
-            if updated:
-                new_text = "\n".join(lines)
-                msg_ts = message.get("ts")
-                client.chat_update(channel=channel, ts=msg_ts, text=new_text)
-                print(f"[STRIKETHROUGH] Updated pairings message")
-                break
-    except Exception as e:
-        print(f"Error strikethrough pair: {e}")
+def _is_pairings_message(message: dict) -> bool:
+    """Check if a message is a pairings message posted by the bot."""
+    return bool(message.get("bot_id")) and "Generated" in message.get("text", "")
+
+
+def _strikethrough_pairs_in(
+    client, channel: str, message: dict, person1: str, person2_list: list[str]
+) -> bool:
+    """Strikethrough pairs in a single pairings message, if it is one.
+
+    Returns:
+        True if the message was updated, False otherwise.
+    """
+    if not _is_pairings_message(message):
+        return False
+
+    # Try to find and strikethrough pairs
+    lines = message["text"].split("\n")
+    line_by_pair = _index_pairing_lines(lines)
+    updated = False
+
+    for person2 in person2_list:
+        i = line_by_pair.get(_pair_key(person1, person2))
+        # Don't strikethrough if already done
+        if i is None or "~" in lines[i]:
+            continue
+        lines[i] = f"~{lines[i]}~"
+        updated = True
+        log.debug(
+            "[STRIKETHROUGH] Found and strikethrough pair: %s ⋯ %s",
+            person1,
+            person2,
+        )
+
+    if not updated:
+        return False
+
+    new_text = "\n".join(lines)
+    client.chat_update(channel=channel, ts=message.get("ts"), text=new_text)
+    log.info("[STRIKETHROUGH] Updated pairings message")
+    return True
+
+
+def _pair_key(name1: str, name2: str) -> frozenset[str]:
+    """Key for a pair of names, ignoring case and surrounding whitespace."""
+    return frozenset((name1.strip().lower(), name2.strip().lower()))
+
+
+def _index_pairing_lines(lines: list[str]) -> dict[frozenset[str], int]:
+    """Map each pair of names in a pairings message to its line.
+
+    Handles separators like "person1 ⋯ person2" or "person1 ... person2", and
+    indexes every pair within a group line.
 
+    Args:
+        lines: Lines of the pairings message
+
+    Returns:
+        Dictionary mapping _pair_key of each pair to its line index
+    """
+    line_by_pair: dict[frozenset[str], int] = {}
+    for i, line in enumerate(lines):
+        match = _PAIRING_LINE_RE.match(line)
+        if not match:
+            continue
+        names = _PAIRING_SEPARATOR_RE.split(match.group(1))
+        for name1, name2 in combinations(names, 2):
+            line_by_pair.setdefault(_pair_key(name1, name2), i)
+    return line_by_pair
 
+
+@lru_cache(maxsize=4096)
 def _normalize_email(email: str) -> str:
     """Normalize email for comparison: lowercase and @g.ucla.edu -> @ucla.edu."""
     if not email:
@@ -386,56 +522,46 @@ def _normalize_email(email: str) -> str:
 
 
 def _get_valid_mentioned_names(
-    mentions: list[str], client, registry: dict, identifier_map: dict[str, int]
+    mentions: list[str], client, registry: RegistryIndex
 ) -> list[str]:
     """Get names of valid people from mention list.
 
     Args:
         mentions: List of user IDs mentioned
         client: Slack client
-        registry: Person registry
-        identifier_map: Mapping of email/name to person ID
+        registry: Person registry with lookup tables
 
     Returns:
         List of names for valid mentions (people in registry), empty if none found
     """
     mentioned_names = []
     for mention_id in mentions:
-        user_info = slack_client.get_user_info(client, mention_id)
+        user_info = slack_client.get_user_info_cached(client, mention_id)
         if not user_info:
-            print(
-                f"[VALIDATION] Skipped mention: Could not fetch user info for {mention_id}"
+            log.debug(
+                "[VALIDATION] Skipped mention: Could not fetch user info for %s",
+                mention_id,
             )
             continue
 
         # Try to match by email first (with normalization), then by name
         person_id = None
         if user_info["email"]:
-            normalized_email = _normalize_email(user_info["email"])
-            # Check against normalized keys in identifier_map
-            for key, pid in identifier_map.items():
-                if (
-                    key.lower() == normalized_email
-                    or _normalize_email(key) == normalized_email
-                ):
-                    person_id = pid
-                    break
+            person_id = registry.by_norm_email.get(_normalize_email(user_info["email"]))
 
         if person_id is None and user_info["real_name"]:
             # Case-insensitive name match
-            normalized_name = user_info["real_name"].lower()
-            for key, pid in identifier_map.items():
-                if key.lower() == normalized_name:
-                    person_id = pid
-                    break
+            person_id = registry.by_norm_name.get(user_info["real_name"].lower())
 
         if person_id is None:
-            print(
-                f"[VALIDATION] Skipped mention: {mention_id} ({user_info.get('email') or user_info.get('real_name')}) not in registry"
+            log.debug(
+                "[VALIDATION] Skipped mention: %s (%s) not in registry",
+                mention_id,
+                user_info.get("email") or user_info.get("real_name"),
             )
             continue
 
-        mentioned_names.append(registry[person_id].name)
+        mentioned_names.append(registry.by_id[person_id].name)
     return mentioned_names
 
 
@@ -452,7 +578,7 @@ def _recover_single_message(
         "unconfirmed" if a confirmed chat was newly recorded,
         or None if no action was taken.
     """
-    bot_user_id = client.auth_test()["user_id"]
+    bot_user_id = slack_client.get_bot_user_id(client)
 
     if message is None:
         try:
@@ -460,8 +586,8 @@ def _recover_single_message(
                 channel=channel, latest=parent_ts, limit=1, inclusive=True
             )
             messages = response.get("messages", [])
-        except Exception as e:
-            print(f"[RECOVER-SINGLE] Error fetching message {parent_ts}: {e}")
+        except Exception:
+            log.exception("[RECOVER-SINGLE] Error fetching message %s", parent_ts)
             return None
 
         if not messages:
@@ -488,8 +614,8 @@ def _recover_single_message(
         try:
             if _respond_to_donut_message(client, channel, ts, text):
                 return "unprocessed"
-        except Exception as e:
-            print(f"[RECOVER-SINGLE] Error processing message {ts}: {e}")
+        except Exception:
+            log.exception("[RECOVER-SINGLE] Error processing message %s", ts)
         return None
 
     bot_reply = _find_bot_reply(client, channel, ts)
@@ -498,8 +624,8 @@ def _recover_single_message(
         try:
             _post_confirmation_prompt(client, channel, ts)
             return "unprocessed"
-        except Exception as e:
-            print(f"[RECOVER-SINGLE] Error posting thread reply for {ts}: {e}")
+        except Exception:
+            log.exception("[RECOVER-SINGLE] Error posting thread reply for %s", ts)
         return None
 
     if "Recorded" in bot_reply.get("text", ""):
@@ -518,13 +644,13 @@ def _recover_single_message(
             client.chat_update(
                 channel=channel, ts=bot_reply["ts"], text="✅ Recorded!"
             )
-        except Exception as e:
-            print(f"[RECOVER-SINGLE] Error updating bot reply for {ts}: {e}")
+        except Exception:
+            log.exception("[RECOVER-SINGLE] Error updating bot reply for %s", ts)
         return None
 
     try:
         if _record_donut_confirmation(client, channel, ts, message):
             return "unconfirmed"
-    except Exception as e:
-        print(f"[RECOVER-SINGLE] Error processing confirmation for {ts}: {e}")
+    except Exception:
+        log.exception("[RECOVER-SINGLE] Error processing confirmation for %s", ts)
     return None
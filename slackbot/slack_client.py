@@ -1,10 +1,130 @@
 """Slack API client and user mapping utilities."""
 
+import logging
+import threading
+import time
+
 from slack_bolt.app import App
 
+log = logging.getLogger(__name__)
+
 # Global cache for user info
 _user_cache = {}
 
+# User ID -> {"email", "real_name"}, populated from the same users_list call
+_id_to_info: dict[str, dict] = {}
+
+# Guards _user_cache and _id_to_info
+_user_cache_lock = threading.Lock()
+
+# users_list snapshot state. The fetch lock lets only one thread call
+# users_list at a time, and is never held while reading the caches above.
+USER_LIST_PAGE_SIZE = 200
+USER_LIST_RETRY_SECONDS = 300
+_user_list_loaded = False
+_user_list_attempted_at: float | None = None
+_user_list_fetch_lock = threading.Lock()
+
+# The bot's own user ID, fetched once via auth_test
+_bot_user_id: str | None = None
+
+# users_info results by user ID, as (fetched_at, info)
+USER_INFO_TTL_SECONDS = 300
+_user_info_cache: dict[str, tuple[float, dict]] = {}
+_user_info_lock = threading.Lock()
+
+
+def get_bot_user_id(client) -> str:
+    """Get the bot's own Slack user ID, calling auth_test only once.
+
+    Args:
+        client: Slack Bolt client
+
+    Returns:
+        The bot's Slack user ID
+    """
+    global _bot_user_id
+
+    if _bot_user_id is None:
+        _bot_user_id = client.auth_test()["user_id"]
+    return _bot_user_id
+
+
+def _fetch_user_list(client) -> list[dict] | None:
+    """Fetch every workspace member from users_list, following pagination.
+
+    Args:
+        client: Slack Bolt client
+
+    Returns:
+        List of Slack user objects, or None if a request failed
+    """
+    members = []
+    cursor = None
+    try:
+        while True:
+            response = client.users_list(cursor=cursor, limit=USER_LIST_PAGE_SIZE)
+            members.extend(response.get("members", []))
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return members
+    except Exception:
+        log.exception("Error fetching user list")
+        return None
+
+
+def _ensure_user_list(client) -> None:
+    """Load the users_list snapshot into the user caches if it isn't loaded.
+
+    Does nothing while another thread is fetching, or for
+    USER_LIST_RETRY_SECONDS after a failed or empty fetch; callers then fall
+    back to per-user lookups instead of waiting on users_list.
+
+    Args:
+        client: Slack Bolt client
+    """
+    global _user_list_loaded, _user_list_attempted_at
+
+    if _user_list_loaded:
+        return
+    attempted_at = _user_list_attempted_at
+    if (
+        attempted_at is not None
+        and time.monotonic() - attempted_at < USER_LIST_RETRY_SECONDS
+    ):
+        return
+    if not _user_list_fetch_lock.acquire(blocking=False):
+        return
+
+    try:
+        if _user_list_loaded:
+            return
+        _user_list_attempted_at = time.monotonic()
+        members = _fetch_user_list(client)
+        if not members:
+            log.warning(
+                "[USERS] users_list unavailable, retrying in %ds",
+                USER_LIST_RETRY_SECONDS,
+            )
+            return
+
+        email_map = {}
+        id_to_info = {}
+        for user in members:
+            if user.get("is_bot"):
+                continue
+            user_info = _extract_user_info(user)
+            id_to_info[user["id"]] = user_info
+            if user_info["email"]:
+                email_map[user_info["email"]] = user["id"]
+
+        with _user_cache_lock:
+            _user_cache.update(email_map)
+            _id_to_info.update(id_to_info)
+        _user_list_loaded = True
+    finally:
+        _user_list_fetch_lock.release()
+
 
 def build_email_to_slack_id_map(client) -> dict[str, str]:
     """Build mapping from email to Slack user ID.
@@ -15,24 +135,33 @@ def build_email_to_slack_id_map(client) -> dict[str, str]:
     Returns:
         Dictionary mapping email addresses to Slack user IDs
     """
-    global _user_cache
+    _ensure_user_list(client)
+    with _user_cache_lock:
+        return dict(_user_cache)
 
-    if _user_cache:
-        return _user_cache
 
-    email_map = {}
+def update_user_cache(user: dict) -> None:
+    """Refresh cached info for a user from a team_join/user_change event.
 
-    try:
-        response = client.users_list()
-        for user in response.get("members", []):
-            email = user.get("profile", {}).get("email")
-            if email and not user.get("is_bot"):
-                email_map[email] = user["id"]
-                _user_cache[email] = user["id"]
-    except Exception as e:
-        print(f"Error fetching user list: {e}")
+    Args:
+        user: Slack user object from the event payload
+    """
+    user_id = user.get("id")
+    if not user_id or user.get("is_bot"):
+        return
+
+    with _user_info_lock:
+        _user_info_cache.pop(user_id, None)
 
-    return email_map
+    # Before the first users_list load there is no snapshot to refresh
+    if not _user_list_loaded:
+        return
+
+    user_info = _extract_user_info(user)
+    with _user_cache_lock:
+        _id_to_info[user_id] = user_info
+        if user_info["email"]:
+            _user_cache[user_info["email"]] = user_id
 
 
 def get_user_slack_id(client, email: str) -> str | None:
@@ -45,8 +174,9 @@ def get_user_slack_id(client, email: str) -> str | None:
     Returns:
         Slack user ID or None if not found
     """
-    email_map = build_email_to_slack_id_map(client)
-    return email_map.get(email)
+    _ensure_user_list(client)
+    with _user_cache_lock:
+        return _user_cache.get(email)
 
 
 def get_user_email(client, user_id: str) -> str | None:
@@ -59,12 +189,8 @@ def get_user_email(client, user_id: str) -> str | None:
     Returns:
         Email address or None if not found
     """
-    try:
-        response = client.users_info(user=user_id)
-        return response.get("user", {}).get("profile", {}).get("email")
-    except Exception as e:
-        print(f"Error fetching user info: {e}")
-        return None
+    user_info = get_user_info_cached(client, user_id)
+    return user_info["email"] if user_info else None
 
 
 def get_user_info(client, user_id: str) -> dict | None:
@@ -77,13 +203,46 @@ def get_user_info(client, user_id: str) -> dict | None:
     Returns:
         Dictionary with email and real_name, or None if not found
     """
+    with _user_info_lock:
+        cached = _user_info_cache.get(user_id)
+    if cached and time.monotonic() - cached[0] < USER_INFO_TTL_SECONDS:
+        return cached[1]
+
     try:
         response = client.users_info(user=user_id)
-        user = response.get("user", {})
-        return {
-            "email": user.get("profile", {}).get("email"),
-            "real_name": user.get("real_name"),
-        }
-    except Exception as e:
-        print(f"Error fetching user info: {e}")
+        user_info = _extract_user_info(response.get("user", {}))
+    except Exception:
+        log.exception("Error fetching user info for %s", user_id)
         return None
+
+    with _user_info_lock:
+        _user_info_cache[user_id] = (time.monotonic(), user_info)
+    return user_info
+
+
+def get_user_info_cached(client, user_id: str) -> dict | None:
+    """Get user info, preferring the users_list snapshot over users_info.
+
+    Only users missing from the snapshot (e.g. new members) cost an API call.
+
+    Args:
+        client: Slack Bolt client
+        user_id: Slack user ID
+
+    Returns:
+        Dictionary with email and real_name, or None if not found
+    """
+    _ensure_user_list(client)
+    with _user_cache_lock:
+        user_info = _id_to_info.get(user_id)
+    if user_info is not None:
+        return user_info
+    return get_user_info(client, user_id)
+
+
+def _extract_user_info(user: dict) -> dict:
+    """Extract email and real_name from a Slack user object."""
+    return {
+        "email": user.get("profile", {}).get("email"),
+        "real_name": user.get("real_name"),
+    }
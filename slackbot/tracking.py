@@ -1,8 +1,47 @@
 """Tracking and history management for donut meetups."""
 
 import csv
+import logging
+import threading
 from pathlib import Path
 
+log = logging.getLogger(__name__)
+
+# Slack timestamps recorded in history, reloaded when the file's mtime or size
+# changes
+_ts_index = {"path": None, "mtime": None, "size": 0, "ts": set()}
+_ts_index_lock = threading.Lock()
+
+
+def _load_ts_index(path: Path) -> set[str]:
+    """Get the set of Slack timestamps in history, rereading it on change.
+
+    Must be called with _ts_index_lock held.
+
+    Args:
+        path: Path to history.csv file
+
+    Returns:
+        Set of timestamps recorded in history
+    """
+    stat = path.stat() if path.exists() else None
+    mtime = stat.st_mtime_ns if stat else None
+    size = stat.st_size if stat else 0
+    # An append within the same coarse mtime tick still changes the size
+    if (
+        _ts_index["path"] != path
+        or _ts_index["mtime"] != mtime
+        or _ts_index["size"] != size
+    ):
+        timestamps = set()
+        if stat is not None:
+            with open(path, "r", newline="") as f:
+                for row in csv.reader(f):
+                    if len(row) >= 3:
+                        timestamps.add(row[2])
+        _ts_index.update(path=path, mtime=mtime, size=size, ts=timestamps)
+    return _ts_index["ts"]
+
 
 def history_contains_ts(history_path: str, ts: str) -> bool:
     """Check if a Slack message timestamp already exists in history.
@@ -14,53 +53,78 @@ def history_contains_ts(history_path: str, ts: str) -> bool:
     Returns:
         True if the timestamp exists in history, False otherwise
     """
-    path = Path(history_path)
-    if not path.exists():
+    with _ts_index_lock:
+        return ts in _load_ts_index(Path(history_path))
+
+
+def _missing_trailing_newline(path: Path) -> bool:
+    """Check if a non-empty file lacks a trailing newline (e.g. hand-edited)."""
+    if not path.exists() or path.stat().st_size == 0:
         return False
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) != b"\n"
 
-    with open(path, "r", newline="") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) >= 3 and row[2] == ts:
-                return True
-    return False
 
+def _append_rows(path: Path, rows: list[list[str]]) -> None:
+    """Append rows to history and keep the timestamp index in sync.
 
-def append_to_history(
-    person1: str, person2: str, history_path: str, slack_ts: str | None = None
-) -> None:
-    """Append a donut chat pair to history.csv.
+    Must be called with _ts_index_lock held.
+
+    Args:
+        path: Path to history.csv file
+        rows: CSV rows to append
+    """
+    # Sync the index first so our own write doesn't force a reload
+    timestamps = _load_ts_index(path)
+    needs_newline = _missing_trailing_newline(path)
+
+    # Append only the new rows; "a" mode creates the file on first use
+    with open(path, "a", newline="") as f:
+        start = f.tell()
+        if needs_newline:
+            f.write("\n")
+        writer = csv.writer(f)
+        writer.writerows(rows)
+        end = f.tell()
+
+    timestamps.update(row[2] for row in rows if len(row) >= 3)
+    stat = path.stat()
+    if start == _ts_index["size"] and stat.st_size == end:
+        _ts_index.update(mtime=stat.st_mtime_ns, size=end)
+    else:
+        # Something else wrote around our append; reread the file next time
+        _ts_index["mtime"] = None
+
+
+def record_pairs(
+    pairs: list[tuple[str, str]], history_path: str, slack_ts: str
+) -> bool:
+    """Append all pairs from one confirmed message, at most once per timestamp.
+
+    The timestamp check and the write happen under the same lock, so
+    concurrent events for the same message cannot record it twice.
 
     Args:
-        person1: Name or email of first person
-        person2: Name or email of second person
+        pairs: List of (person1, person2) tuples to record
         history_path: Path to history.csv file
-        slack_ts: Optional Slack message timestamp for deduplication
+        slack_ts: Slack message timestamp of the confirmed message
+
+    Returns:
+        True if the pairs were recorded, False if slack_ts was already recorded
     """
     try:
         path = Path(history_path)
-
-        # Read existing data
-        rows = []
-        if path.exists():
-            with open(path, "r", newline="") as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-
-        # Append new row
-        row = [person1, person2]
-        if slack_ts:
-            row.append(slack_ts)
-        rows.append(row)
-
-        # Write back
-        with open(path, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerows(rows)
-
-        print(f"Recorded donut chat: {person1}, {person2}")
-    except Exception as e:
-        print(f"Error appending to history: {e}")
+        with _ts_index_lock:
+            if slack_ts in _load_ts_index(path):
+                return False
+            _append_rows(path, [[p1, p2, slack_ts] for p1, p2 in pairs])
+
+        for person1, person2 in pairs:
+            log.info("Recorded donut chat: %s, %s", person1, person2)
+        return True
+    except Exception:
+        log.exception("Error appending to history")
         raise
 
 
@@ -78,9 +142,8 @@ def get_history_size(history_path: str) -> int:
         if not path.exists():
             return 0
 
-        with open(path, "r", newline="") as f:
-            reader = csv.reader(f)
-            return sum(1 for _ in reader)
-    except Exception as e:
-        print(f"Error reading history: {e}")
+        with open(path, "r") as f:
+            return sum(1 for _ in f)
+    except Exception:
+        log.exception("Error reading history")
         return 0
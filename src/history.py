@@ -1,7 +1,11 @@
 """Registry and history parsing for donut pairings."""
 
 import csv
+import io
+from collections import Counter
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
 from rich import print
 
@@ -13,6 +17,8 @@ PERSON_NOT_IN_REGISTRY_WARNING = (
     "Person {person} appears in history but not in registry, skipping"
 )
 INVALID_CSV_LINE_WARNING = "Found odd line (will skip this): {line}"
+SKIPPED_ROWS_WARNING = "Skipped {count} row(s) in {filename}"
+MAX_LISTED_WARNINGS = 20
 
 
 @dataclass
@@ -33,55 +39,108 @@ def _parse_csv_row(row: list[str]) -> tuple[str, str, str | None] | None:
         Tuple of (person1, person2, slack_ts) if valid, None otherwise.
         slack_ts is None for rows without a timestamp.
     """
-    if len(row) < MIN_CSV_COLUMNS or len(row) > MAX_CSV_COLUMNS:
-        if row:  # Only warn if row is not empty
-            print(f":warning: {INVALID_CSV_LINE_WARNING.format(line=row)}")
-        return None
-    person1, person2 = row[0], row[1]
-    slack_ts = row[2] if len(row) == MAX_CSV_COLUMNS else None
-    return person1, person2, slack_ts
+    # Most rows have no timestamp, so check that case first
+    num_columns = len(row)
+    if num_columns == MIN_CSV_COLUMNS:
+        return row[0], row[1], None
+    if num_columns == MAX_CSV_COLUMNS:
+        return row[0], row[1], row[2]
+    return None
 
 
-def parse_registry(filename: str | Path) -> dict[int, Person]:
-    """Parse a registry CSV file and return a mapping of ID to Person.
+def split_csv_lines(lines: Iterable[str]) -> Iterator[list[str]]:
+    """Split CSV lines with str.split, switching to csv.reader at the first quote.
+
+    Args:
+        lines: Lines with their line endings, e.g. a file opened with newline=""
+
+    Returns:
+        Iterator of rows, with an empty row for each blank line
+    """
+    lines = iter(lines)
+    for line in lines:
+        if '"' in line:
+            # Quoted fields may hold commas or newlines, so let csv take over
+            yield from csv.reader(chain([line], lines))
+            return
+        line = line.rstrip("\r\n")
+        yield line.split(",") if line else []
+
+
+def _print_warnings(summary: str, details: list[str]) -> None:
+    """Print a single warning with the first few details, if there are any.
+
+    Args:
+        summary: Headline for the warning
+        details: One message per skipped row
+    """
+    if not details:
+        return
+    lines = [f":warning: {summary}"]
+    lines.extend(f"  {detail}" for detail in details[:MAX_LISTED_WARNINGS])
+    if len(details) > MAX_LISTED_WARNINGS:
+        lines.append(f"  ... and {len(details) - MAX_LISTED_WARNINGS} more")
+    print("\n".join(lines))
+
+
+def _read_csv_rows(filename: str | Path) -> Iterator[tuple[str, str, str | None]]:
+    """Yield the valid rows of a CSV file, skipping bad lines.
+
+    Bad lines are reported in a single warning once the file is exhausted.
+
+    Args:
+        filename: Path to the CSV file
+
+    Returns:
+        Iterator of (person1, person2, slack_ts) tuples
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    # Read and decode the whole file at once rather than line by line
+    with open(filename, "rb") as csvfile:
+        text = csvfile.read().decode("utf-8")
+
+    invalid: list[str] = []
+    # str.splitlines also breaks on \x0c, \x85, \u2028 and friends; only split
+    # on \r and \n as csv does
+    for row in split_csv_lines(io.StringIO(text, newline="")):
+        parsed = _parse_csv_row(row)
+        if parsed is not None:
+            yield parsed
+        elif row:  # Only warn if row is not empty
+            invalid.append(INVALID_CSV_LINE_WARNING.format(line=row))
+    _print_warnings(
+        SKIPPED_ROWS_WARNING.format(count=len(invalid), filename=filename), invalid
+    )
+
+
+def parse_registry(filename: str | Path) -> list[Person]:
+    """Parse a registry CSV file and return its people, indexed by ID.
 
     Args:
         filename: Path to the registry CSV file with columns (name, email)
 
     Returns:
-        Dictionary mapping person IDs to Person objects
+        List of Person objects, where each person's ID is their index
 
     Raises:
         FileNotFoundError: If the registry file does not exist
     """
     try:
-        registry: dict[int, Person] = {}
-        with open(filename, newline="") as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                parsed = _parse_csv_row(row)
-                if parsed is None:
-                    continue
-
-                name, email, _ = parsed
-                person_id = len(registry)
-                registry[person_id] = Person(name=name, email=email)
-
-        return registry
+        return [
+            Person(name=name, email=email)
+            for name, email, _ in _read_csv_rows(filename)
+        ]
     except FileNotFoundError:
         raise FileNotFoundError(f"Registry file not found: {filename}")
 
 
-def _warn_unknown_person(person: str) -> None:
-    """Print warning for a person not found in registry."""
-    print(f":warning: {PERSON_NOT_IN_REGISTRY_WARNING.format(person=person)}")
-
-
-def _build_identifier_mapping(registry: dict[int, Person]) -> dict[str, int]:
+def build_index(registry: list[Person]) -> dict[str, int]:
     """Build a mapping from identifiers (name/email) to person IDs.
 
     Args:
-        registry: Dictionary of person IDs to Person objects
+        registry: List of Person objects indexed by person ID
 
     Returns:
         Dictionary mapping identifiers to person IDs
@@ -89,26 +148,30 @@ def _build_identifier_mapping(registry: dict[int, Person]) -> dict[str, int]:
     Raises:
         KeyError: If duplicate identifiers are found in the registry
     """
-    identifier_to_id: dict[str, int] = {}
+    ids = range(len(registry))
+    identifiers = [person.name for person in registry] + [
+        person.email for person in registry
+    ]
+    identifier_to_id = dict(zip(identifiers, chain(ids, ids)))
 
-    for person_id, person in registry.items():
-        for identifier in [person.name, person.email]:
-            if identifier in identifier_to_id:
-                raise KeyError(
-                    IDENTIFIER_MAPPING_ERROR_TEMPLATE.format(identifier=identifier)
-                )
-            identifier_to_id[identifier] = person_id
+    # Any duplicate collapses two keys into one; find it only on this error path
+    if len(identifier_to_id) != len(identifiers):
+        duplicate, _ = Counter(identifiers).most_common(1)[0]
+        raise KeyError(IDENTIFIER_MAPPING_ERROR_TEMPLATE.format(identifier=duplicate))
 
     return identifier_to_id
 
 
 def parse_history(
-    registry: dict[int, Person], filename: str | Path
+    registry: list[Person], filename: str | Path
 ) -> list[tuple[int, int]]:
     """Parse a history CSV file and return past meeting pairs.
 
+    Builds the identifier index on every call; use build_index and
+    parse_history_with_index to reuse it across calls.
+
     Args:
-        registry: Dictionary mapping person IDs to Person objects
+        registry: List of Person objects indexed by person ID
         filename: Path to the history CSV file with columns (person1, person2)
 
     Returns:
@@ -117,31 +180,47 @@ def parse_history(
     Raises:
         FileNotFoundError: If the history file does not exist
     """
-    identifier_to_id = _build_identifier_mapping(registry)
-    past_meetings: list[tuple[int, int]] = []
+    return parse_history_with_index(build_index(registry), filename)
 
-    try:
-        with open(filename, newline="") as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                parsed = _parse_csv_row(row)
-                if parsed is None:
-                    continue
 
-                person1, person2, _ = parsed
+def parse_history_with_index(
+    identifier_to_id: dict[str, int], filename: str | Path
+) -> list[tuple[int, int]]:
+    """Parse a history CSV file using a prebuilt identifier index.
 
-                if person1 not in identifier_to_id:
-                    _warn_unknown_person(person1)
-                    continue
-                if person2 not in identifier_to_id:
-                    _warn_unknown_person(person2)
-                    continue
+    Args:
+        identifier_to_id: Mapping of identifiers to person IDs from build_index
+        filename: Path to the history CSV file with columns (person1, person2)
 
-                id1 = identifier_to_id[person1]
-                id2 = identifier_to_id[person2]
+    Returns:
+        List of tuples containing past meeting pairs as (id1, id2)
 
-                past_meetings.append((id1, id2))
+    Raises:
+        FileNotFoundError: If the history file does not exist
+    """
+    past_meetings: list[tuple[int, int]] = []
+    # Unknown people in the order first seen (dict as an ordered set)
+    unknown: dict[str, None] = {}
+    num_skipped = 0
 
-        return past_meetings
+    try:
+        for person1, person2, _ in _read_csv_rows(filename):
+            id1 = identifier_to_id.get(person1)
+            id2 = identifier_to_id.get(person2)
+            if id1 is None or id2 is None:
+                if id1 is None:
+                    unknown[person1] = None
+                if id2 is None:
+                    unknown[person2] = None
+                num_skipped += 1
+                continue
+
+            past_meetings.append((id1, id2))
     except FileNotFoundError:
         raise FileNotFoundError(f"History file not found: {filename}")
+
+    _print_warnings(
+        SKIPPED_ROWS_WARNING.format(count=num_skipped, filename=filename),
+        [PERSON_NOT_IN_REGISTRY_WARNING.format(person=person) for person in unknown],
+    )
+    return past_meetings
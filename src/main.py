@@ -39,7 +39,8 @@ def main() -> None:
     registry = history.parse_registry(args.registry)
     print(f"{len(registry)} members to match")
 
-    past_meetings = history.parse_history(registry, args.history)
+    index = history.build_index(registry)
+    past_meetings = history.parse_history_with_index(index, args.history)
 
     # Generate pairings
     pairs = solver.make_assignment(registry, past_meetings)
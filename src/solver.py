@@ -1,137 +1,308 @@
 """Matching algorithm for generating optimal donut pairings."""
 
+import random
 from collections import Counter
-from itertools import combinations
-from typing import Iterable
+from itertools import chain, combinations
 
 import networkx as nx
 
 from .history import Person
 
+# Number of shuffled pairings to try before running the matching algorithm
+RANDOM_PAIRING_ATTEMPTS = 8
+# Number of times to match on the sparse graph before using the full graph
+SPARSE_MATCHING_ATTEMPTS = 3
+# Number of random fresh partners to give each person per sparse attempt
+SPARSE_GRAPH_DEGREE = 3
+# Share of all possible pairs that may have met before the sparse graph is skipped
+SPARSE_HISTORY_FRACTION = 0.5
+
 
 def get_past_meeting_counts(
     history: list[tuple[int, int]],
-) -> Iterable[tuple[tuple[int, int], int]]:
+) -> dict[tuple[int, int], int]:
     """Count the number of past meetings for each pair of people.
 
     Args:
         history: List of past meeting pairs as (id1, id2)
 
     Returns:
-        ItemsView of normalized pairs and their meeting counts
+        Dictionary mapping normalized pairs to their meeting counts
     """
-    normalized = [tuple(sorted(pair)) for pair in history]
-    return Counter(normalized).items()
+    return Counter((a, b) if a <= b else (b, a) for a, b in history)
+
+
+def _build_meeting_matrix(
+    nodes: list[int], meeting_counts: dict[tuple[int, int], int]
+) -> list[dict[int, int]]:
+    """Build the symmetric meeting count matrix as one sparse row per person.
+
+    Args:
+        nodes: IDs of the people to match
+        meeting_counts: Dictionary mapping normalized pairs to meeting counts
+
+    Returns:
+        List indexed by person ID of the people each person met and how often
+    """
+    matrix: list[dict[int, int]] = [{} for _ in nodes]
+    for (id1, id2), count in meeting_counts.items():
+        matrix[id1][id2] = count
+        matrix[id2][id1] = count
+    return matrix
 
 
 def _get_past_meetings_count(
-    pair: tuple[int, int], meeting_counts: dict[tuple[int, int], int]
+    id1: int, id2: int, meeting_matrix: list[dict[int, int]]
 ) -> int:
     """Get the number of past meetings for a pair.
 
     Args:
-        pair: Tuple of (id1, id2)
-        meeting_counts: Dictionary mapping normalized pairs to meeting counts
+        id1: ID of the first person
+        id2: ID of the second person
+        meeting_matrix: Meeting count rows from _build_meeting_matrix
 
     Returns:
         Number of past meetings for this pair
     """
-    normalized = tuple(sorted(pair))
-    return meeting_counts.get(normalized, 0)
+    return meeting_matrix[id1].get(id2, 0)
+
+
+def _random_pairing(nodes: list[int]) -> set[tuple[int, int]]:
+    """Pair up a shuffled copy of nodes, leaving one out if the count is odd."""
+    shuffled = random.sample(nodes, len(nodes))
+    return set(zip(shuffled[::2], shuffled[1::2]))
+
 
+def _build_dense_graph(
+    nodes: list[int], meeting_counts: dict[tuple[int, int], int]
+) -> nx.Graph:
+    """Build the complete graph, weighting edges by negated meeting counts.
 
-def _form_triplet_groups(
+    Args:
+        nodes: IDs of the people to match
+        meeting_counts: Dictionary mapping pairs to past meeting counts
+
+    Returns:
+        Graph with an edge between every pair of people
+    """
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from(combinations(nodes, 2), weight=0)
+    graph.add_weighted_edges_from(
+        (id1, id2, -count) for (id1, id2), count in meeting_counts.items()
+    )
+    return graph
+
+
+def _add_fresh_edges(
+    graph: nx.Graph, nodes: list[int], meeting_matrix: list[dict[int, int]]
+) -> None:
+    """Give each person up to SPARSE_GRAPH_DEGREE random partners they never met.
+
+    Args:
+        graph: Graph to add the weight 0 edges to
+        nodes: IDs of the people to match
+        meeting_matrix: Meeting count rows from _build_meeting_matrix
+    """
+    num_candidates = min(2 * SPARSE_GRAPH_DEGREE, len(nodes))
+    for id1 in nodes:
+        met = meeting_matrix[id1]
+        partners = [
+            id2
+            for id2 in random.sample(nodes, num_candidates)
+            if id2 != id1 and id2 not in met
+        ]
+        graph.add_edges_from(
+            ((id1, id2) for id2 in partners[:SPARSE_GRAPH_DEGREE]), weight=0
+        )
+
+
+def _is_fresh_matching(
     matching: set[tuple[int, int]],
-    unmatched_id: int,
-    registry: dict[int, Person],
+    num_people: int,
+    meeting_matrix: list[dict[int, int]],
+) -> bool:
+    """Check if a matching covers everyone possible without any repeat pairs.
+
+    All edge weights are <= 0, so such a matching is optimal on the full graph.
+    """
+    return len(matching) == num_people // 2 and all(
+        _get_past_meetings_count(id1, id2, meeting_matrix) == 0 for id1, id2 in matching
+    )
+
+
+def _find_max_weight_matching(
+    nodes: list[int],
     meeting_counts: dict[tuple[int, int], int],
-) -> list[tuple[Person, ...] | tuple[Person, Person]]:
-    """Form groups with a triplet for the unmatched person.
+    meeting_matrix: list[dict[int, int]],
+) -> set[tuple[int, int]]:
+    """Find a maximum cardinality matching minimizing total past meetings.
 
-    Finds the pair with the lowest total meeting count (with the unmatched person
-    and with each other) and forms a triplet with them. Other pairs remain as pairs.
+    Edge weights are negated meeting counts, so max_weight_matching prefers
+    pairs that met less. Unless most pairs have already met, first looks for a
+    matching on a sparse graph holding only random pairs who never met; if it
+    covers everyone possible it is optimal. Each retry adds more random fresh
+    pairs, falling back to the full graph after SPARSE_MATCHING_ATTEMPTS tries.
 
     Args:
-        matching: Set of matched pairs (id1, id2)
-        unmatched_id: ID of the person without a match
-        registry: Dictionary mapping person IDs to Person objects
+        nodes: IDs of the people to match
         meeting_counts: Dictionary mapping pairs to past meeting counts
+        meeting_matrix: Meeting count rows from _build_meeting_matrix
 
     Returns:
-        List of person groups (pairs or triplets)
+        Set of matched pairs (id1, id2)
     """
-    # Find pair with lowest total meeting count to add the unmatched person
-    min_pair = min(
-        matching,
-        key=lambda pair: (
-            _get_past_meetings_count(pair, meeting_counts)
-            + _get_past_meetings_count((unmatched_id, pair[0]), meeting_counts)
-            + _get_past_meetings_count((unmatched_id, pair[1]), meeting_counts)
-        ),
-    )
+    num_pairs = len(nodes) * (len(nodes) - 1) // 2
+    if len(meeting_counts) <= SPARSE_HISTORY_FRACTION * num_pairs:
+        sparse_graph = nx.Graph()
+        sparse_graph.add_nodes_from(nodes)
+        for _ in range(SPARSE_MATCHING_ATTEMPTS):
+            _add_fresh_edges(sparse_graph, nodes, meeting_matrix)
+            matching = nx.max_weight_matching(sparse_graph, maxcardinality=True)
+            if len(matching) == len(nodes) // 2:
+                return matching
 
-    # Build result with triplet for the chosen pair
-    groups: list[tuple[Person, ...] | tuple[Person, Person]] = []
-    for pair in matching:
-        if pair == min_pair:
-            groups.append(
-                (registry[pair[0]], registry[pair[1]], registry[unmatched_id])
-            )
-        else:
-            groups.append((registry[pair[0]], registry[pair[1]]))
+    dense_graph = _build_dense_graph(nodes, meeting_counts)
+    return nx.max_weight_matching(dense_graph, maxcardinality=True)
 
-    return groups
 
+def _find_triplet_pair(
+    matching: set[tuple[int, int]],
+    unmatched_id: int,
+    meeting_matrix: list[dict[int, int]],
+) -> tuple[int, int] | None:
+    """Find the pair the unmatched person should join to form a triplet.
 
-def make_assignment(
-    registry: dict[int, Person], history: list[tuple[int, int]]
-) -> list[tuple[Person, ...] | tuple[Person, Person]]:
-    """Generate optimal pairings using maximum weight matching algorithm.
+    Finds the pair with the lowest total meeting count (with the unmatched person
+    and with each other), stopping at the first pair nobody in the triplet has
+    met before.
+
+    Args:
+        matching: Set of matched pairs (id1, id2)
+        unmatched_id: ID of the person without a match
+        meeting_matrix: Meeting count rows from _build_meeting_matrix
+
+    Returns:
+        The chosen pair (id1, id2), or None if the matching is empty
+    """
+    unmatched_row = meeting_matrix[unmatched_id]
+    min_pair = None
+    min_count = None
+    for id1, id2 in matching:
+        count = (
+            meeting_matrix[id1].get(id2, 0)
+            + unmatched_row.get(id1, 0)
+            + unmatched_row.get(id2, 0)
+        )
+        if min_count is None or count < min_count:
+            min_pair = (id1, id2)
+            min_count = count
+            if count == 0:
+                break
+    return min_pair
+
+
+def make_assignment_soa(
+    registry: list[Person], history: list[tuple[int, int]]
+) -> tuple[list[int], list[int]]:
+    """Generate optimal pairings as flat arrays of person IDs and group sizes.
 
     Uses a graph-based approach where edge weights are negated meeting counts,
     ensuring people who have met fewer times are prioritized.
 
     For odd numbers of people, the leftover person is added to the pair with
-    the lowest total meeting count to form a triplet.
+    the lowest total meeting count to form a triplet. With fewer than two
+    people there is nobody to match, so no groups are returned.
 
     Args:
-        registry: Dictionary mapping person IDs to Person objects
+        registry: List of Person objects indexed by person ID
         history: List of past meeting pairs as (id1, id2)
 
     Returns:
-        List of person pair tuples (person1, person2) or triplets (person1, person2, person3)
+        Tuple of (ids, group_sizes), where ids lists the members of each group
+        back to back and group_sizes gives the size of each group in order
     """
-    # Create graph with all possible edges
-    graph = nx.Graph()
-    graph.add_nodes_from(registry.keys())
-
-    # Add all possible edges with default weight 0
-    for person1_id, person2_id in combinations(graph.nodes, 2):
-        graph.add_edge(person1_id, person2_id, weight=0)
+    # With at most three people there is only one possible grouping
+    if len(registry) <= 3:
+        if len(registry) < 2:
+            return [], []
+        return list(range(len(registry))), [len(registry)]
 
-    # Build meeting counts dict for later use
-    meeting_counts = dict(get_past_meeting_counts(history))
+    nodes = list(range(len(registry)))
 
-    # Update weights based on past meetings (negate to use max_weight_matching)
-    for pair, count in meeting_counts.items():
-        graph.add_edge(pair[0], pair[1], weight=-count)
+    meeting_counts = get_past_meeting_counts(history)
+    meeting_matrix = _build_meeting_matrix(nodes, meeting_counts)
 
-    # Find maximum weight matching
-    matching = nx.max_weight_matching(graph, maxcardinality=True)
+    # A shuffled pairing with no repeat pairs is already optimal, and when the
+    # history is sparse one usually turns up quickly, skipping the matching
+    for _ in range(RANDOM_PAIRING_ATTEMPTS):
+        matching = _random_pairing(nodes)
+        if _is_fresh_matching(matching, len(nodes), meeting_matrix):
+            break
+    else:
+        matching = _find_max_weight_matching(nodes, meeting_counts, meeting_matrix)
 
     # Check if there's an unmatched person (odd number of people)
     unmatched_id = None
+    triplet_pair = None
     if len(registry) % 2 == 1:
-        matched_ids = {id1 for id1, id2 in matching} | {id2 for id1, id2 in matching}
-        unmatched_id = (set(registry.keys()) - matched_ids).pop()
+        matched_ids = set(chain.from_iterable(matching))
+        unmatched_id = next(iter(set(nodes).difference(matched_ids)))
+        triplet_pair = _find_triplet_pair(matching, unmatched_id, meeting_matrix)
+
+    ids: list[int] = []
+    group_sizes: list[int] = []
+    for pair in matching:
+        ids.extend(pair)
+        if pair == triplet_pair:
+            ids.append(unmatched_id)
+            group_sizes.append(3)
+        else:
+            group_sizes.append(2)
+
+    return ids, group_sizes
+
+
+def to_groups(
+    registry: list[Person], ids: list[int], group_sizes: list[int]
+) -> list[tuple[Person, ...] | tuple[Person, Person]]:
+    """Convert the output of make_assignment_soa back into groups of people.
+
+    Args:
+        registry: List of Person objects indexed by person ID
+        ids: Person IDs of each group, back to back
+        group_sizes: Size of each group in order
 
-    # Convert IDs back to Person objects
-    if unmatched_id is not None:
-        donut_groups = _form_triplet_groups(
-            matching, unmatched_id, registry, meeting_counts
+    Returns:
+        List of person groups (pairs or triplets)
+    """
+    groups: list[tuple[Person, ...] | tuple[Person, Person]] = []
+    start = 0
+    for size in group_sizes:
+        groups.append(
+            tuple(registry[person_id] for person_id in ids[start : start + size])
         )
-    else:
-        # All matched, return pairs as before
-        donut_groups = [(registry[id1], registry[id2]) for id1, id2 in matching]
+        start += size
+    return groups
+
+
+def make_assignment(
+    registry: list[Person], history: list[tuple[int, int]]
+) -> list[tuple[Person, ...] | tuple[Person, Person]]:
+    """Generate optimal pairings using maximum weight matching algorithm.
 
-    return donut_groups
+    Uses a graph-based approach where edge weights are negated meeting counts,
+    ensuring people who have met fewer times are prioritized.
+
+    For odd numbers of people, the leftover person is added to the pair with
+    the lowest total meeting count to form a triplet.
+
+    Args:
+        registry: List of Person objects indexed by person ID
+        history: List of past meeting pairs as (id1, id2)
+
+    Returns:
+        List of person pair tuples (person1, person2) or triplets (person1, person2, person3)
+    """
+    ids, group_sizes = make_assignment_soa(registry, history)
+    return to_groups(registry, ids, group_sizes)
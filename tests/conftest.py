@@ -0,0 +1,7 @@
+"""Shared test setup."""
+
+import os
+
+# slackbot.config refuses to import without credentials; tests never call Slack
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-test")
+os.environ.setdefault("SLACK_SIGNING_SECRET", "test-secret")
@@ -0,0 +1,297 @@
+"""Tests for the handlers module."""
+
+import os
+from collections import OrderedDict
+
+import pytest
+
+from slackbot import config, handlers, slack_client, tracking
+
+PAIRINGS_TEXT = "*Generated 2 donut chats:*\n• Alice ⋯ Bob\n• Charlie ⋯ Diana\n"
+
+
+class FakeClient:
+    """Slack client stub serving channel history and recording updates."""
+
+    def __init__(self, messages=None):
+        self.messages = messages or []
+        self.history_calls = []
+        self.replies_calls = []
+        self.updates = []
+
+    def conversations_history(self, channel, limit, latest=None, inclusive=False):
+        self.history_calls.append(latest)
+        if latest is not None:
+            return {"messages": [m for m in self.messages if m["ts"] == latest]}
+        return {"messages": self.messages[:limit]}
+
+    def conversations_replies(self, channel, ts, limit):
+        self.replies_calls.append(ts)
+        return {"messages": []}
+
+    def chat_postMessage(self, channel, text, thread_ts=None):
+        return {"ts": f"reply-{thread_ts}"}
+
+    def chat_update(self, channel, ts, text):
+        self.updates.append((ts, text))
+
+
+@pytest.fixture(autouse=True)
+def reset_caches(monkeypatch):
+    """Start each test without cached messages or registry."""
+    monkeypatch.setattr(handlers, "_pairings_ts", {})
+    monkeypatch.setattr(handlers, "_bot_reply_ts", OrderedDict())
+    monkeypatch.setattr(handlers, "_registry_cache", {"mtime": None, "index": None})
+
+
+@pytest.fixture
+def registry_file(tmp_path, monkeypatch):
+    """Point the bot at a registry CSV with a duplicate email."""
+    path = tmp_path / "registry.csv"
+    path.write_text(
+        "Alice,Alice@UCLA.edu\n"
+        "Bob,bob@ucla.edu\n"
+        "Charlie Brown,charlie@ucla.edu\n"
+        "Alice Again,alice@ucla.edu\n"
+    )
+    monkeypatch.setattr(config, "REGISTRY_PATH", str(path))
+    return path
+
+
+@pytest.fixture
+def history_file(tmp_path, monkeypatch):
+    """Point the bot at a history CSV that does not exist yet."""
+    path = tmp_path / "history.csv"
+    monkeypatch.setattr(config, "HISTORY_PATH", str(path))
+    monkeypatch.setattr(
+        tracking, "_ts_index", {"path": None, "mtime": None, "size": 0, "ts": set()}
+    )
+    return path
+
+
+@pytest.fixture
+def slack_users(monkeypatch):
+    """Serve Slack user lookups from a dict of user ID -> user info."""
+    users = {
+        "UALICE": {"email": "alice@g.ucla.edu", "real_name": "Alice"},
+        "UBOB": {"email": "BOB@G.UCLA.EDU", "real_name": "Robert"},
+        "UCHARLIE": {"email": "", "real_name": "charlie brown"},
+        "UEVE": {"email": "eve@ucla.edu", "real_name": "Eve"},
+    }
+    monkeypatch.setattr(
+        slack_client, "get_user_email", lambda client, user_id: users[user_id]["email"]
+    )
+    monkeypatch.setattr(
+        slack_client, "get_user_info_cached", lambda client, user_id: users[user_id]
+    )
+    return users
+
+
+class TestStrikethroughPairInMessage:
+    """Tests for _strikethrough_pair_in_message."""
+
+    def test_uses_cached_pairings_message(self):
+        """Test that the cached pairings message is updated without a scan."""
+        client = FakeClient([{"ts": "1.0", "bot_id": "B1", "text": PAIRINGS_TEXT}])
+        handlers._pairings_ts["C1"] = "1.0"
+
+        handlers._strikethrough_pair_in_message(client, "C1", "Alice", ["Bob"])
+
+        assert client.history_calls == ["1.0"]
+        assert client.updates == [
+            ("1.0", PAIRINGS_TEXT.replace("• Alice ⋯ Bob", "~• Alice ⋯ Bob~"))
+        ]
+
+    def test_scans_when_pair_not_in_cached_message(self):
+        """Test that a late confirmation strikes the previous round's message."""
+        older_text = "*Generated 1 donut chats:*\n• Eve ⋯ Frank\n"
+        client = FakeClient(
+            [
+                {"ts": "2.0", "bot_id": "B1", "text": PAIRINGS_TEXT},
+                {"ts": "1.0", "bot_id": "B1", "text": older_text},
+            ]
+        )
+        handlers._pairings_ts["C1"] = "2.0"
+
+        handlers._strikethrough_pair_in_message(client, "C1", "Eve", ["Frank"])
+
+        assert client.history_calls == ["2.0", None]
+        assert client.updates == [
+            ("1.0", older_text.replace("• Eve ⋯ Frank", "~• Eve ⋯ Frank~"))
+        ]
+
+    def test_scans_history_without_cached_message(self):
+        """Test that recent messages are scanned when nothing is cached."""
+        client = FakeClient(
+            [
+                {"ts": "2.0", "user": "U1", "text": "Generated nothing"},
+                {"ts": "1.0", "bot_id": "B1", "text": PAIRINGS_TEXT},
+            ]
+        )
+
+        handlers._strikethrough_pair_in_message(client, "C1", "Diana", ["Charlie"])
+
+        assert client.history_calls == [None]
+        assert [ts for ts, _ in client.updates] == ["1.0"]
+
+
+class TestRecordDonutConfirmation:
+    """Tests for _record_donut_confirmation."""
+
+    def test_matches_normalized_emails_and_names(
+        self, registry_file, history_file, slack_users
+    ):
+        """Test that the poster and mentions resolve through normalized keys."""
+        message = {"user": "UALICE", "text": "with <@UBOB> and <@UCHARLIE>"}
+
+        recorded = handlers._record_donut_confirmation(
+            FakeClient(), "C1", "1.000100", message
+        )
+
+        # The poster's email matches both Alice entries; the first one wins
+        assert recorded
+        assert history_file.read_text().splitlines() == [
+            "Alice,Bob,1.000100",
+            "Alice,Charlie Brown,1.000100",
+            "Bob,Charlie Brown,1.000100",
+        ]
+
+    def test_skips_unknown_poster(self, registry_file, history_file, slack_users):
+        """Test that a poster outside the registry records nothing."""
+        message = {"user": "UEVE", "text": "with <@UBOB>"}
+
+        recorded = handlers._record_donut_confirmation(
+            FakeClient(), "C1", "1.000100", message
+        )
+
+        assert not recorded
+        assert not history_file.exists()
+
+    def test_skips_unknown_mentions(self, registry_file, history_file, slack_users):
+        """Test that only mentions found in the registry are recorded."""
+        message = {"user": "UBOB", "text": "with <@UEVE> and <@UALICE>"}
+
+        handlers._record_donut_confirmation(FakeClient(), "C1", "1.000100", message)
+
+        assert history_file.read_text().splitlines() == ["Bob,Alice,1.000100"]
+
+
+class TestGetRegistry:
+    """Tests for _get_registry."""
+
+    def test_reparses_only_after_mtime_change(self, registry_file, monkeypatch):
+        """Test that the registry file is parsed again only once it changes."""
+        calls = []
+        parse_registry = handlers.history.parse_registry
+
+        def spy(path):
+            calls.append(path)
+            return parse_registry(path)
+
+        monkeypatch.setattr(handlers.history, "parse_registry", spy)
+
+        first = handlers._get_registry()
+        assert handlers._get_registry() is first
+        assert len(calls) == 1
+
+        with open(registry_file, "a") as f:
+            f.write("Diana,diana@ucla.edu\n")
+        stat = os.stat(registry_file)
+        os.utime(registry_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        updated = handlers._get_registry()
+        assert len(calls) == 2
+        assert updated.by_norm_email["diana@ucla.edu"] == 4
+
+
+class TestBotReplyCache:
+    """Tests for the cache of confirmation prompt replies."""
+
+    def test_cache_hit_skips_thread_fetch(self):
+        """Test that a remembered reply is found without conversations_replies."""
+        client = FakeClient()
+        handlers._post_confirmation_prompt(client, "C1", "1.0")
+
+        assert handlers._get_bot_reply_ts(client, "C1", "1.0") == "reply-1.0"
+        assert client.replies_calls == []
+
+    def test_evicts_least_recently_used(self, monkeypatch):
+        """Test that the oldest unused entry is dropped past the cache size."""
+        monkeypatch.setattr(handlers, "BOT_REPLY_CACHE_SIZE", 2)
+        client = FakeClient()
+        handlers._post_confirmation_prompt(client, "C1", "1.0")
+        handlers._post_confirmation_prompt(client, "C1", "2.0")
+        # Using the first entry makes the second one the oldest
+        handlers._get_bot_reply_ts(client, "C1", "1.0")
+        handlers._post_confirmation_prompt(client, "C1", "3.0")
+
+        assert list(handlers._bot_reply_ts) == [("C1", "1.0"), ("C1", "3.0")]
+        assert handlers._get_bot_reply_ts(client, "C1", "2.0") is None
+        assert client.replies_calls == ["2.0"]
+
+
+class TestIndexPairingLines:
+    """Tests for _index_pairing_lines."""
+
+    def test_plain_line(self):
+        """Test that a pairing line is indexed under both names."""
+        line_by_pair = handlers._index_pairing_lines(["*Generated:*", "• Alice ⋯ Bob"])
+
+        assert line_by_pair == {frozenset({"alice", "bob"}): 1}
+
+    def test_struck_through_line(self):
+        """Test that an already struck-through line is still indexed."""
+        line_by_pair = handlers._index_pairing_lines(["~• Alice ⋯ Bob~"])
+
+        assert line_by_pair == {frozenset({"alice", "bob"}): 0}
+
+    def test_dots_separator(self):
+        """Test that "..." works as a separator."""
+        line_by_pair = handlers._index_pairing_lines(["• Alice ... Bob"])
+
+        assert line_by_pair == {frozenset({"alice", "bob"}): 0}
+
+    def test_triplet_line(self):
+        """Test that every pair in a triplet maps to its line."""
+        line_by_pair = handlers._index_pairing_lines(["• Alice ⋯ Bob ⋯ Charlie"])
+
+        assert line_by_pair == {
+            frozenset({"alice", "bob"}): 0,
+            frozenset({"alice", "charlie"}): 0,
+            frozenset({"bob", "charlie"}): 0,
+        }
+
+    def test_whole_names_only(self):
+        """Test that a name does not match inside a longer name."""
+        line_by_pair = handlers._index_pairing_lines(
+            ["• Alexa ⋯ Bob", "• Alex ⋯ Charlie"]
+        )
+
+        assert handlers._pair_key("Alex", "Bob") not in line_by_pair
+        assert line_by_pair[handlers._pair_key("Alex", "Charlie")] == 1
+
+
+class TestStrikethroughPairsIn:
+    """Tests for _strikethrough_pairs_in."""
+
+    def test_registry_names_with_whitespace(self):
+        """Test that names padded with whitespace in the registry still match."""
+        client = FakeClient([])
+        message = {"ts": "1.0", "bot_id": "B1", "text": PAIRINGS_TEXT}
+
+        updated = handlers._strikethrough_pairs_in(
+            client, "C1", message, " Alice ", ["Bob  "]
+        )
+
+        assert updated
+        assert "~• Alice ⋯ Bob~" in client.updates[0][1]
+
+    def test_skips_non_bot_messages(self):
+        """Test that user messages are never edited."""
+        client = FakeClient([])
+        message = {"ts": "1.0", "user": "U1", "text": PAIRINGS_TEXT}
+
+        assert not handlers._strikethrough_pairs_in(
+            client, "C1", message, "Alice", ["Bob"]
+        )
+        assert client.updates == []
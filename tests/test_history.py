@@ -0,0 +1,191 @@
+"""Tests for the history module."""
+
+import pytest
+
+from src.history import (
+    Person,
+    build_index,
+    parse_history,
+    parse_history_with_index,
+    parse_registry,
+    split_csv_lines,
+)
+
+
+@pytest.fixture
+def registry_file(tmp_path):
+    """Create a registry CSV file for testing."""
+    path = tmp_path / "registry.csv"
+    path.write_text(
+        "Alice,alice@example.com\n"
+        "Bob,bob@example.com\n"
+        "\n"
+        "Charlie,charlie@example.com\n"
+    )
+    return path
+
+
+class TestParseRegistry:
+    """Tests for parse_registry."""
+
+    def test_assigns_sequential_ids(self, registry_file):
+        """Test that people get IDs in file order."""
+        registry = parse_registry(registry_file)
+
+        assert registry[0] == Person(name="Alice", email="alice@example.com")
+        assert registry[1] == Person(name="Bob", email="bob@example.com")
+        assert registry[2] == Person(name="Charlie", email="charlie@example.com")
+        assert len(registry) == 3
+
+    def test_skips_invalid_rows(self, tmp_path):
+        """Test that rows with the wrong number of columns are skipped."""
+        path = tmp_path / "registry.csv"
+        path.write_text("Alice,alice@example.com\nBob\na,b,c,d\n")
+
+        registry = parse_registry(path)
+
+        assert len(registry) == 1
+
+    def test_quoted_fields(self, tmp_path):
+        """Test that quoted fields containing commas are parsed."""
+        path = tmp_path / "registry.csv"
+        path.write_text('"Doe, Jane",jane@example.com\n')
+
+        registry = parse_registry(path)
+
+        assert registry[0] == Person(name="Doe, Jane", email="jane@example.com")
+
+    def test_quoted_field_after_plain_rows(self, tmp_path):
+        """Test that a quoted multi-line field after plain rows is parsed."""
+        path = tmp_path / "registry.csv"
+        path.write_text(
+            "Alice,alice@example.com\r\n"
+            '"Doe,\nJane",jane@example.com\n'
+            "Bob,bob@example.com\n"
+        )
+
+        registry = parse_registry(path)
+
+        assert registry == [
+            Person(name="Alice", email="alice@example.com"),
+            Person(name="Doe,\nJane", email="jane@example.com"),
+            Person(name="Bob", email="bob@example.com"),
+        ]
+
+    def test_unicode_line_separators_in_name(self, tmp_path):
+        """Test that only \\r and \\n end a row, as in the csv module."""
+        path = tmp_path / "registry.csv"
+        path.write_text(
+            "Alice\x0cSmith,alice@example.com\nBob\u2028Jones,bob@example.com\n",
+            newline="",
+        )
+
+        registry = parse_registry(path)
+
+        assert registry == [
+            Person(name="Alice\x0cSmith", email="alice@example.com"),
+            Person(name="Bob\u2028Jones", email="bob@example.com"),
+        ]
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing registry file raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            parse_registry(tmp_path / "missing.csv")
+
+
+class TestSplitCsvLines:
+    """Tests for split_csv_lines."""
+
+    def test_quoted_field_in_file(self, tmp_path):
+        """Test that a file opened with newline="" keeps quoted newlines."""
+        path = tmp_path / "history.csv"
+        path.write_text('Alice,Bob\n"Doe,\nJane",Bob,1.000100\n\nCharlie,Bob\n')
+
+        with open(path, newline="") as f:
+            rows = list(split_csv_lines(f))
+
+        assert rows == [
+            ["Alice", "Bob"],
+            ["Doe,\nJane", "Bob", "1.000100"],
+            [],
+            ["Charlie", "Bob"],
+        ]
+
+
+class TestParseHistory:
+    """Tests for parse_history."""
+
+    def test_maps_names_and_emails_to_ids(self, registry_file, tmp_path):
+        """Test that history rows resolve by name or email."""
+        history_file = tmp_path / "history.csv"
+        history_file.write_text(
+            "Alice,Bob\nbob@example.com,charlie@example.com,1700000000.000100\n"
+        )
+        registry = parse_registry(registry_file)
+
+        assert parse_history(registry, history_file) == [(0, 1), (1, 2)]
+
+    def test_skips_unknown_people(self, registry_file, tmp_path):
+        """Test that rows naming people outside the registry are skipped."""
+        history_file = tmp_path / "history.csv"
+        history_file.write_text("Alice,Mallory\nAlice,Charlie\n")
+        registry = parse_registry(registry_file)
+
+        assert parse_history(registry, history_file) == [(0, 2)]
+
+    def test_warns_once_for_skipped_rows(self, registry_file, tmp_path, capsys):
+        """Test that skipped rows are reported in one truncated warning."""
+        history_file = tmp_path / "history.csv"
+        history_file.write_text("".join(f"Alice,Stranger{i}\n" for i in range(25)))
+        registry = parse_registry(registry_file)
+
+        assert parse_history(registry, history_file) == []
+
+        out = capsys.readouterr().out
+        assert out.count("Skipped 25 row(s)") == 1
+        assert "Stranger19" in out
+        assert "Stranger20" not in out
+        assert "... and 5 more" in out
+
+    def test_warns_once_per_unknown_person(self, registry_file, tmp_path, capsys):
+        """Test that an unknown person on several rows is listed once."""
+        history_file = tmp_path / "history.csv"
+        history_file.write_text("Alice,Mallory\nMallory,Bob\nMallory,Trent\n")
+        registry = parse_registry(registry_file)
+
+        assert parse_history(registry, history_file) == []
+
+        out = capsys.readouterr().out
+        assert "Skipped 3 row(s)" in out
+        assert out.count("Person Mallory") == 1
+        assert out.count("Person Trent") == 1
+
+    def test_duplicate_identifier_raises(self, tmp_path):
+        """Test that duplicate identifiers in the registry are rejected."""
+        registry = [
+            Person(name="Alice", email="alice@example.com"),
+            Person(name="Alice", email="alice2@example.com"),
+        ]
+        history_file = tmp_path / "history.csv"
+        history_file.write_text("")
+
+        with pytest.raises(KeyError, match="duplicate key Alice"):
+            parse_history(registry, history_file)
+
+    def test_reuses_prebuilt_index(self, registry_file, tmp_path):
+        """Test that one index can parse several history files."""
+        first = tmp_path / "first.csv"
+        first.write_text("Alice,Bob\n")
+        second = tmp_path / "second.csv"
+        second.write_text("Charlie,alice@example.com\n")
+        index = build_index(parse_registry(registry_file))
+
+        assert parse_history_with_index(index, first) == [(0, 1)]
+        assert parse_history_with_index(index, second) == [(2, 0)]
+
+    def test_missing_file(self, registry_file, tmp_path):
+        """Test that a missing history file raises FileNotFoundError."""
+        registry = parse_registry(registry_file)
+
+        with pytest.raises(FileNotFoundError):
+            parse_history(registry, tmp_path / "missing.csv")
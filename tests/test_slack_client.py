@@ -0,0 +1,86 @@
+"""Tests for the slack_client module."""
+
+import pytest
+
+from slackbot import slack_client
+
+
+class FakeClient:
+    """Slack client stub serving users_list pages and users_info."""
+
+    def __init__(self, pages=None, error=None):
+        self.pages = pages or []
+        self.error = error
+        self.users_list_calls = 0
+        self.users_info_calls = 0
+
+    def users_list(self, cursor=None, limit=None):
+        self.users_list_calls += 1
+        if self.error:
+            raise self.error
+        index = int(cursor) if cursor else 0
+        next_cursor = str(index + 1) if index + 1 < len(self.pages) else ""
+        return {
+            "members": self.pages[index] if self.pages else [],
+            "response_metadata": {"next_cursor": next_cursor},
+        }
+
+    def users_info(self, user):
+        self.users_info_calls += 1
+        return {"user": _member(user, f"{user.lower()}@example.com")}
+
+
+def _member(user_id, email):
+    """Build a Slack user object."""
+    return {"id": user_id, "real_name": user_id, "profile": {"email": email}}
+
+
+@pytest.fixture(autouse=True)
+def reset_caches(monkeypatch):
+    """Start each test with empty user caches."""
+    monkeypatch.setattr(slack_client, "_user_cache", {})
+    monkeypatch.setattr(slack_client, "_id_to_info", {})
+    monkeypatch.setattr(slack_client, "_user_info_cache", {})
+    monkeypatch.setattr(slack_client, "_user_list_loaded", False)
+    monkeypatch.setattr(slack_client, "_user_list_attempted_at", None)
+
+
+class TestUserList:
+    """Tests for the users_list snapshot."""
+
+    def test_follows_pagination(self):
+        """Test that users on later pages are found without users_info."""
+        client = FakeClient(
+            pages=[
+                [_member("U1", "one@example.com")],
+                [_member("U2", "two@example.com")],
+            ]
+        )
+
+        user_info = slack_client.get_user_info_cached(client, "U2")
+
+        assert user_info == {"email": "two@example.com", "real_name": "U2"}
+        assert slack_client.get_user_slack_id(client, "one@example.com") == "U1"
+        assert client.users_list_calls == 2
+        assert client.users_info_calls == 0
+
+    def test_backs_off_after_failure(self):
+        """Test that a failed users_list is not retried on every lookup."""
+        client = FakeClient(error=RuntimeError("ratelimited"))
+
+        first = slack_client.get_user_info_cached(client, "U1")
+        second = slack_client.get_user_info_cached(client, "U2")
+
+        assert first["email"] == "u1@example.com"
+        assert second["email"] == "u2@example.com"
+        assert client.users_list_calls == 1
+        assert client.users_info_calls == 2
+
+    def test_backs_off_after_empty_list(self):
+        """Test that a users_list with no members counts as a failure."""
+        client = FakeClient()
+
+        slack_client.get_user_info_cached(client, "U1")
+        slack_client.get_user_info_cached(client, "U2")
+
+        assert client.users_list_calls == 1
@@ -2,29 +2,30 @@
 
 import pytest
 
+from src import solver
 from src.history import Person
-from src.solver import make_assignment
+from src.solver import make_assignment, make_assignment_soa, to_groups
 
 
 @pytest.fixture
 def sample_registry():
     """Create a sample registry for testing."""
-    return {
-        0: Person(name="Alice", email="alice@example.com"),
-        1: Person(name="Bob", email="bob@example.com"),
-        2: Person(name="Charlie", email="charlie@example.com"),
-        3: Person(name="Diana", email="diana@example.com"),
-    }
+    return [
+        Person(name="Alice", email="alice@example.com"),
+        Person(name="Bob", email="bob@example.com"),
+        Person(name="Charlie", email="charlie@example.com"),
+        Person(name="Diana", email="diana@example.com"),
+    ]
 
 
 @pytest.fixture
 def odd_registry():
     """Create a registry with odd number of people."""
-    return {
-        0: Person(name="Alice", email="alice@example.com"),
-        1: Person(name="Bob", email="bob@example.com"),
-        2: Person(name="Charlie", email="charlie@example.com"),
-    }
+    return [
+        Person(name="Alice", email="alice@example.com"),
+        Person(name="Bob", email="bob@example.com"),
+        Person(name="Charlie", email="charlie@example.com"),
+    ]
 
 
 class TestMakeAssignmentEven:
@@ -48,7 +49,7 @@ class TestMakeAssignmentEven:
             for person in group:
                 all_people.add(person.email)
 
-        expected = {person.email for person in sample_registry.values()}
+        expected = {person.email for person in sample_registry}
         assert all_people == expected
 
     def test_no_one_paired_twice(self, sample_registry):
@@ -70,6 +71,69 @@ class TestMakeAssignmentEven:
             emails = {person.email for person in group}
             assert not ("alice@example.com" in emails and "bob@example.com" in emails)
 
+    def test_finds_only_fresh_matching(self, sample_registry):
+        """Test that the single repeat-free matching is found every time."""
+        history = [(0, 1), (0, 2), (1, 3), (2, 3)]
+        for _ in range(20):
+            result = make_assignment(sample_registry, history)
+            groups = {frozenset(person.email for person in group) for group in result}
+            assert groups == {
+                frozenset({"alice@example.com", "diana@example.com"}),
+                frozenset({"bob@example.com", "charlie@example.com"}),
+            }
+
+    def test_mostly_met_history_uses_full_graph(self, sample_registry, monkeypatch):
+        """Test that the full graph picks the pairs that met least."""
+        dense_calls = []
+        build_dense_graph = solver._build_dense_graph
+
+        def spy(*args):
+            dense_calls.append(args)
+            return build_dense_graph(*args)
+
+        monkeypatch.setattr(solver, "_build_dense_graph", spy)
+        # Everyone met once, and every pair but Alice/Diana and Bob/Charlie twice
+        history = [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)]
+        history += [(0, 1), (2, 3), (0, 2), (1, 3)]
+        result = make_assignment(sample_registry, history)
+
+        assert len(dense_calls) == 1
+        groups = {frozenset(person.email for person in group) for group in result}
+        assert groups == {
+            frozenset({"alice@example.com", "diana@example.com"}),
+            frozenset({"bob@example.com", "charlie@example.com"}),
+        }
+
+    def test_falls_back_when_no_fresh_matching(self, monkeypatch):
+        """Test that the full graph is used once every sparse attempt fails."""
+        calls = {"sparse": 0, "dense": 0}
+        add_fresh_edges = solver._add_fresh_edges
+        build_dense_graph = solver._build_dense_graph
+
+        def sparse_spy(*args):
+            calls["sparse"] += 1
+            return add_fresh_edges(*args)
+
+        def dense_spy(*args):
+            calls["dense"] += 1
+            return build_dense_graph(*args)
+
+        monkeypatch.setattr(solver, "_add_fresh_edges", sparse_spy)
+        monkeypatch.setattr(solver, "_build_dense_graph", dense_spy)
+        registry = [
+            Person(name=f"Person {i}", email=f"person{i}@example.com") for i in range(6)
+        ]
+        # People 0 and 1 have only person 5 left to meet, so one must repeat
+        history = [(0, 1), (0, 2), (0, 3), (0, 4), (1, 2), (1, 3), (1, 4)]
+        ids, group_sizes = make_assignment_soa(registry, history)
+
+        assert calls == {"sparse": solver.SPARSE_MATCHING_ATTEMPTS, "dense": 1}
+        pairs = {frozenset(ids[i : i + 2]) for i in range(0, len(ids), 2)}
+        assert group_sizes == [2, 2, 2]
+        assert sorted(ids) == list(range(6))
+        repeats = {frozenset(pair) for pair in history} & pairs
+        assert len(repeats) == 1
+
 
 class TestMakeAssignmentOdd:
     """Tests for make_assignment with odd number of people."""
@@ -92,7 +156,7 @@ class TestMakeAssignmentOdd:
             for person in group:
                 all_people.add(person.email)
 
-        expected = {person.email for person in odd_registry.values()}
+        expected = {person.email for person in odd_registry}
         assert all_people == expected
 
     def test_triplet_added_to_lowest_meeting_pair(self, odd_registry):
@@ -114,13 +178,13 @@ class TestMakeAssignmentOdd:
 
     def test_triplet_with_fresh_pair(self):
         """Test triplet formation when there's a fresh pair."""
-        registry = {
-            0: Person(name="Alice", email="alice@example.com"),
-            1: Person(name="Bob", email="bob@example.com"),
-            2: Person(name="Charlie", email="charlie@example.com"),
-            3: Person(name="Diana", email="diana@example.com"),
-            4: Person(name="Eve", email="eve@example.com"),
-        }
+        registry = [
+            Person(name="Alice", email="alice@example.com"),
+            Person(name="Bob", email="bob@example.com"),
+            Person(name="Charlie", email="charlie@example.com"),
+            Person(name="Diana", email="diana@example.com"),
+            Person(name="Eve", email="eve@example.com"),
+        ]
         # Charlie and Diana met once, others haven't met
         history = [(2, 3)]
         result = make_assignment(registry, history)
@@ -135,9 +199,13 @@ class TestMakeAssignmentOdd:
         assert triplet is not None
         assert pair is not None
 
-        # The triplet should contain Eve (unmatched)
-        triplet_emails = {person.email for person in triplet}
-        assert "eve@example.com" in triplet_emails
+        # Everyone is placed exactly once, and whoever is left out of the
+        # matching joins a group without Charlie and Diana meeting again
+        emails = [person.email for group in result for person in group]
+        assert sorted(emails) == sorted(person.email for person in registry)
+        for group in result:
+            group_emails = {person.email for person in group}
+            assert not {"charlie@example.com", "diana@example.com"} <= group_emails
 
 
 class TestMakeAssignmentEdgeCases:
@@ -145,10 +213,10 @@ class TestMakeAssignmentEdgeCases:
 
     def test_single_pair(self):
         """Test with exactly two people."""
-        registry = {
-            0: Person(name="Alice", email="alice@example.com"),
-            1: Person(name="Bob", email="bob@example.com"),
-        }
+        registry = [
+            Person(name="Alice", email="alice@example.com"),
+            Person(name="Bob", email="bob@example.com"),
+        ]
         result = make_assignment(registry, [])
 
         assert len(result) == 1
@@ -164,3 +232,31 @@ class TestMakeAssignmentEdgeCases:
 
         assert len(result) == 1
         assert len(result[0]) == 3
+
+    def test_fewer_than_two_people(self):
+        """Test that nobody is matched without at least two people."""
+        registry = [Person(name="Alice", email="alice@example.com")]
+
+        assert make_assignment([], []) == []
+        assert make_assignment(registry, []) == []
+
+
+class TestMakeAssignmentSoa:
+    """Tests for the flat-array form of make_assignment."""
+
+    def test_group_sizes_cover_ids(self, odd_registry):
+        """Test that group sizes add up to everyone, with one triplet."""
+        ids, group_sizes = make_assignment_soa(odd_registry, [])
+
+        assert sorted(ids) == [0, 1, 2]
+        assert group_sizes == [3]
+
+    def test_to_groups_decodes_ids(self, sample_registry):
+        """Test that to_groups rebuilds groups of people from the arrays."""
+        ids, group_sizes = make_assignment_soa(sample_registry, [(0, 1), (2, 3)])
+        result = to_groups(sample_registry, ids, group_sizes)
+
+        assert group_sizes == [2, 2]
+        assert [person for group in result for person in group] == [
+            sample_registry[person_id] for person_id in ids
+        ]
@@ -0,0 +1,104 @@
+"""Tests for the tracking module."""
+
+import os
+
+import pytest
+
+from slackbot import tracking
+
+
+@pytest.fixture(autouse=True)
+def reset_ts_index(monkeypatch):
+    """Start each test with an empty timestamp index."""
+    monkeypatch.setattr(
+        tracking, "_ts_index", {"path": None, "mtime": None, "size": 0, "ts": set()}
+    )
+
+
+@pytest.fixture
+def history_path(tmp_path):
+    """Path to a history file that does not exist yet."""
+    return str(tmp_path / "history.csv")
+
+
+def _append_externally(path, text):
+    """Append to a file as another writer would, bumping its mtime."""
+    with open(path, "a") as f:
+        f.write(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+class TestRecordPairs:
+    """Tests for record_pairs."""
+
+    def test_records_pairs_with_timestamp(self, history_path):
+        """Test that every pair is written with the message timestamp."""
+        recorded = tracking.record_pairs(
+            [("Alice", "Bob"), ("Alice", "Charlie")], history_path, "1.000100"
+        )
+
+        assert recorded
+        with open(history_path) as f:
+            assert f.read().splitlines() == [
+                "Alice,Bob,1.000100",
+                "Alice,Charlie,1.000100",
+            ]
+        assert tracking.history_contains_ts(history_path, "1.000100")
+
+    def test_duplicate_timestamp_is_not_recorded(self, history_path):
+        """Test that a message timestamp is only recorded once."""
+        tracking.record_pairs([("Alice", "Bob")], history_path, "1.000100")
+
+        assert not tracking.record_pairs([("Alice", "Bob")], history_path, "1.000100")
+        assert tracking.get_history_size(history_path) == 1
+
+    def test_appends_after_missing_trailing_newline(self, history_path):
+        """Test that new rows start on their own line in a hand-edited file."""
+        with open(history_path, "w") as f:
+            f.write("Alice,Bob")
+
+        tracking.record_pairs([("Charlie", "Diana")], history_path, "2.000200")
+
+        with open(history_path) as f:
+            assert f.read().splitlines() == ["Alice,Bob", "Charlie,Diana,2.000200"]
+
+
+class TestTimestampIndex:
+    """Tests for the history timestamp index."""
+
+    def test_missing_file_contains_nothing(self, history_path):
+        """Test that a missing history file has no timestamps."""
+        assert not tracking.history_contains_ts(history_path, "1.000100")
+
+    def test_reloads_after_external_append(self, history_path):
+        """Test that rows written by someone else are picked up."""
+        tracking.record_pairs([("Alice", "Bob")], history_path, "1.000100")
+        _append_externally(history_path, "Charlie,Diana,2.000200\r\n")
+
+        assert tracking.history_contains_ts(history_path, "2.000200")
+        assert not tracking.record_pairs(
+            [("Charlie", "Diana")], history_path, "2.000200"
+        )
+
+    def test_reloads_after_append_within_same_mtime(self, history_path):
+        """Test that an append that keeps the mtime is caught by the size."""
+        tracking.record_pairs([("Alice", "Bob")], history_path, "1.000100")
+        stat = os.stat(history_path)
+        with open(history_path, "a") as f:
+            f.write("Charlie,Diana,2.000200\r\n")
+        os.utime(history_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert tracking.history_contains_ts(history_path, "2.000200")
+
+    def test_reloads_after_concurrent_append(self, history_path):
+        """Test that a write landing just before our append is not hidden."""
+        tracking.record_pairs([("Alice", "Bob")], history_path, "1.000100")
+        with open(history_path, "a") as f:
+            f.write("Charlie,Diana,2.000200\r\n")
+        # Pretend the index was loaded before that write happened
+        tracking._ts_index["mtime"] = os.stat(history_path).st_mtime_ns
+
+        tracking.record_pairs([("Eve", "Frank")], history_path, "3.000300")
+
+        assert tracking.history_contains_ts(history_path, "2.000200")